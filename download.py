@@ -2,13 +2,147 @@ from yt_dlp import YoutubeDL
 import os
 import re
 import sys
-from typing import Optional, List, Dict, Tuple
-from urllib.parse import urlparse, parse_qs
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from functools import lru_cache
+import time
+import shelve
+import atexit
+import threading
+import subprocess
+from typing import Callable, Optional, List, Dict, Tuple
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing import freeze_support
+from collections import Counter, OrderedDict
+
+
+# Query parameters that only track the share source and never change the content
+TRACKING_PARAMS = ('si', 'feature', 'pp')
+
+# Maximum number of concurrent metadata probes
+METADATA_WORKERS = 8
+
+# Parallel fragment connections shared by all download workers
+TOTAL_FRAGMENT_CONNECTIONS = 8
+
+# Containers whose audio track is AAC and can be remuxed into .m4a without transcoding
+AAC_SOURCE_EXTS = ('.m4a', '.mp4', '.aac')
+
+# URL separators and the accepted YouTube URL shapes, compiled once at import
+_SPLIT_RE = re.compile(r'[,\s]+')
+_CHANNEL_PATH_PREFIXES = ('/@', '/channel/', '/c/', '/user/')
+_YT_PATH_PREFIXES = ('/watch?', '/playlist?') + _CHANNEL_PATH_PREFIXES
+_YT_RE = re.compile(
+    r'^(?:https?://)?(?:[\w-]+\.)?'
+    r'(?:youtube\.com(?:' + '|'.join(map(re.escape, _YT_PATH_PREFIXES)) + r')|youtu\.be/)',
+    re.IGNORECASE)
+
+# Persistent metadata cache shared between runs
+METADATA_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'vid2text', 'ytmeta')
+METADATA_CACHE_TTL = 24 * 60 * 60  # seconds
+_metadata_cache_lock = threading.Lock()
+
+# In-memory metadata cache, bounded in size and age
+METADATA_MEMORY_CACHE_SIZE = 128
+METADATA_MEMORY_CACHE_TTL = 10 * 60  # seconds
+_url_info_cache: 'OrderedDict[str, Tuple[float, str, Dict]]' = OrderedDict()
+_url_info_cache_lock = threading.RLock()
+
+# Reusable YoutubeDL instances, one per options profile and thread
+_ydl_local = threading.local()
+_ydl_instances: List[YoutubeDL] = []
+_ydl_instances_lock = threading.Lock()
+
+
+def normalize_url(url: str) -> str:
+    """
+    Strip tracking parameters and trailing separators from a YouTube URL so
+    that equivalent URLs share a single cache entry.
+
+    Args:
+        url (str): YouTube URL to normalize
+
+    Returns:
+        str: URL without tracking parameters
+    """
+    parsed_url = urlparse(url.strip().rstrip('&?'))
+    if not parsed_url.query:
+        return parsed_url.geturl()
+
+    query = [(key, value) for key, value in parse_qs(parsed_url.query, keep_blank_values=True).items()
+             if key not in TRACKING_PARAMS]
+    return urlunparse(parsed_url._replace(query=urlencode(query, doseq=True)))
+
+
+def _is_channel_url(url: str) -> bool:
+    """Check whether the path after youtube.com starts like a channel URL."""
+    return url.partition('youtube.com')[2].startswith(_CHANNEL_PATH_PREFIXES)
+
+
+def _get_ydl(ydl_opts: Dict) -> YoutubeDL:
+    """
+    Return a YoutubeDL instance for the given options, reusing the one this thread
+    created earlier for the same options so its HTTP connections stay open.
+
+    Instances are kept per thread because a YoutubeDL object tracks playlist state
+    while extracting and must not be shared between concurrent calls.
+
+    Args:
+        ydl_opts (Dict): yt-dlp options; must not contain per-call hooks
+
+    Returns:
+        YoutubeDL: Cached instance for these options
+    """
+    key = repr(sorted(ydl_opts.items()))
+    profiles = getattr(_ydl_local, 'profiles', None)
+    if profiles is None:
+        profiles = _ydl_local.profiles = {}
+
+    ydl = profiles.get(key)
+    if ydl is None:
+        ydl = profiles[key] = YoutubeDL(ydl_opts)
+        with _ydl_instances_lock:
+            _ydl_instances.append(ydl)
+    return ydl
+
+
+@atexit.register
+def _close_ydl_instances() -> None:
+    """Close every cached YoutubeDL instance on interpreter exit."""
+    with _ydl_instances_lock:
+        for ydl in _ydl_instances:
+            # Same teardown as leaving a `with YoutubeDL(...)` block (saves cookies)
+            ydl.__exit__(None, None, None)
+        _ydl_instances.clear()
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Rewrite a YouTube URL to one canonical form so the same content is only
+    downloaded once, whichever way it was linked.
+
+    Videos become https://www.youtube.com/watch?v=<id> and playlists keep only
+    their list= parameter. Channel URLs just lose their tracking parameters.
+
+    Args:
+        url (str): YouTube URL to canonicalize
+
+    Returns:
+        str: Canonical URL
+    """
+    if '://' not in url:
+        url = 'https://' + url
+
+    parsed_url = urlparse(url)
+    query_params = parse_qs(parsed_url.query)
+
+    if 'list' in query_params:
+        return f"https://www.youtube.com/playlist?list={query_params['list'][0]}"
+    if 'v' in query_params:
+        return f"https://www.youtube.com/watch?v={query_params['v'][0]}"
+    if parsed_url.netloc.lower().endswith('youtu.be') and parsed_url.path.strip('/'):
+        return f"https://www.youtube.com/watch?v={parsed_url.path.strip('/').split('/')[0]}"
+    return normalize_url(url)
 
 
-@lru_cache(maxsize=128)
 def get_url_info(url: str) -> Tuple[str, Dict]:
     """
     Get URL information with caching to avoid duplicate yt-dlp calls.
@@ -18,8 +152,89 @@ def get_url_info(url: str) -> Tuple[str, Dict]:
         url (str): YouTube URL to analyze
 
     Returns:
-        Tuple[str, Dict]: (content_type, info_dict) where content_type is 'video', 'playlist', or 'channel'
+        Tuple[str, Dict]: (content_type, info_dict) where content_type is 'video', 'playlist', or 'channel'.
+            info_dict only holds the fields from _slim_info()
+    """
+    url = normalize_url(url)
+    with _url_info_cache_lock:
+        entry = _url_info_cache.get(url)
+        if entry is not None and time.time() - entry[0] <= METADATA_MEMORY_CACHE_TTL:
+            _url_info_cache.move_to_end(url)
+            return entry[1], entry[2]
+
+    content_type, info = _extract_url_info(url)
+
+    with _url_info_cache_lock:
+        _url_info_cache[url] = (time.time(), content_type, info)
+        _url_info_cache.move_to_end(url)
+        while len(_url_info_cache) > METADATA_MEMORY_CACHE_SIZE:
+            _url_info_cache.popitem(last=False)
+    return content_type, info
+
+
+def _slim_info(info: Dict) -> Dict:
+    """Keep only the metadata fields the downloader uses, so cached entries stay small."""
+    return {
+        'title': info.get('title'),
+        'uploader_id': info.get('uploader_id'),
+        'playlist_count': info.get('playlist_count'),
+        'entries_count': len(info.get('entries') or []),
+    }
+
+
+def _load_cached_info(url: str) -> Optional[Tuple[str, Dict]]:
+    """Return the on-disk (content_type, info_dict) for a URL if it has not expired."""
+    try:
+        with _metadata_cache_lock, shelve.open(METADATA_CACHE_PATH, flag='r') as cache:
+            entry = cache.get(url)
+    except Exception:
+        return None
+
+    if entry is None:
+        return None
+
+    stored_at, content_type, info = entry
+    if time.time() - stored_at > METADATA_CACHE_TTL:
+        return None
+    return content_type, info
+
+
+def _store_cached_info(url: str, content_type: str, info: Dict) -> None:
+    """Persist (content_type, info_dict) for a URL. Cache failures are never fatal."""
+    try:
+        os.makedirs(os.path.dirname(METADATA_CACHE_PATH), exist_ok=True)
+        with _metadata_cache_lock, shelve.open(METADATA_CACHE_PATH) as cache:
+            cache[url] = (time.time(), content_type, info)
+    except Exception:
+        pass
+
+
+def clear_metadata_cache(urls: Optional[List[str]] = None) -> None:
+    """
+    Drop cached metadata so the next lookup queries YouTube again.
+
+    Args:
+        urls (List[str], optional): URLs to forget. Clears the whole cache if omitted
     """
+    with _url_info_cache_lock:
+        _url_info_cache.clear()
+    try:
+        with _metadata_cache_lock, shelve.open(METADATA_CACHE_PATH) as cache:
+            if urls is None:
+                cache.clear()
+            else:
+                for url in urls:
+                    cache.pop(normalize_url(url), None)
+    except Exception:
+        pass
+
+
+def _extract_url_info(url: str) -> Tuple[str, Dict]:
+    """Run the yt-dlp detection for an already normalized URL."""
+    cached = _load_cached_info(url)
+    if cached is not None:
+        return cached
+
     try:
         # Use yt-dlp to extract info without downloading
         ydl_opts = {
@@ -30,42 +245,42 @@ def get_url_info(url: str) -> Tuple[str, Dict]:
             'playlist_items': '1',  # Only check first item for speed
         }
 
-        with YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-
-            # Check if info extraction was successful
-            if info is None:
-                # Fallback to URL parsing if yt-dlp fails
-                parsed_url = urlparse(url)
-                query_params = parse_qs(parsed_url.query)
-
-                # Check for channel patterns
-                if '/@' in url or '/channel/' in url or '/c/' in url or '/user/' in url:
-                    return 'channel', {}
-                elif 'list' in query_params:
-                    return 'playlist', {}
-                else:
-                    return 'video', {}
-
-            # Determine content type based on yt-dlp info
-            content_type = info.get('_type', 'video')
-
-            # Handle channel detection
-            if content_type == 'playlist':
-                # Check if it's actually a channel (uploader_id indicates channel content)
-                if info.get('uploader_id') and ('/@' in url or '/channel/' in url or '/c/' in url or '/user/' in url):
-                    return 'channel', info
-                else:
-                    return 'playlist', info
-
-            return content_type, info
+        ydl = _get_ydl(ydl_opts)
+        info = ydl.extract_info(url, download=False)
+
+        # Check if info extraction was successful
+        if info is None:
+            # Fallback to URL parsing if yt-dlp fails
+            parsed_url = urlparse(url)
+            query_params = parse_qs(parsed_url.query)
+
+            # Check for channel patterns
+            if _is_channel_url(url):
+                return 'channel', {}
+            elif 'list' in query_params:
+                return 'playlist', {}
+            else:
+                return 'video', {}
+
+        # Determine content type based on yt-dlp info
+        content_type = info.get('_type', 'video')
+
+        # Handle channel detection
+        if content_type == 'playlist':
+            # Check if it's actually a channel (uploader_id indicates channel content)
+            if info.get('uploader_id') and _is_channel_url(url):
+                content_type = 'channel'
+
+        info = _slim_info(info)
+        _store_cached_info(url, content_type, info)
+        return content_type, info
 
     except Exception:
         # Simple fallback: check URL patterns
         parsed_url = urlparse(url)
         query_params = parse_qs(parsed_url.query)
 
-        if '/@' in url or '/channel/' in url or '/c/' in url or '/user/' in url:
+        if _is_channel_url(url):
             return 'channel', {}
         elif 'list' in query_params:
             return 'playlist', {}
@@ -111,25 +326,16 @@ def parse_multiple_urls(input_string: str) -> List[str]:
         input_string (str): String containing one or more URLs
 
     Returns:
-        List[str]: List of cleaned URLs
+        List[str]: List of canonical, de-duplicated URLs
     """
-    # Use regex to split by multiple separators: comma, space, newline, tab
-    urls = re.split(r'[,\s\n\t]+', input_string.strip())
-    urls = [url.strip() for url in urls if url.strip()]
+    # Split by multiple separators: comma, space, newline, tab
+    urls = [url for url in _SPLIT_RE.split(input_string.strip()) if url]
 
     # Validate URLs (basic YouTube URL check)
     valid_urls = []
     invalid_count = 0
     for url in urls:
-        if ('youtube.com' in url or 'youtu.be' in url) and (
-            '/watch?' in url or
-            '/playlist?' in url or
-            '/@' in url or
-            '/channel/' in url or
-            '/c/' in url or
-            '/user/' in url or
-            'youtu.be/' in url
-        ):
+        if _YT_RE.match(url):
             valid_urls.append(url)
         elif url:  # Only show warning for non-empty strings
             print(f"⚠️  Skipping invalid URL: {url}")
@@ -139,7 +345,13 @@ def parse_multiple_urls(input_string: str) -> List[str]:
         print(
             f"💡 Found {len(valid_urls)} valid YouTube URLs, skipped {invalid_count} invalid entries")
 
-    return valid_urls
+    # Drop duplicates (e.g. youtu.be and watch?v= links to the same video), keeping order
+    unique_urls = list(dict.fromkeys(canonicalize_url(url) for url in valid_urls))
+    duplicate_count = len(valid_urls) - len(unique_urls)
+    if duplicate_count > 0:
+        print(f"💡 Removed {duplicate_count} duplicate URL(s)")
+
+    return unique_urls
 
 
 def get_available_formats(url: str) -> None:
@@ -150,18 +362,85 @@ def get_available_formats(url: str) -> None:
         url (str): YouTube URL to check formats for
     """
     ydl_opts = {
-        'listformats': True,
-        'quiet': False
+        'quiet': True,
+        'no_warnings': True,
+        'skip_download': True,
+        'noplaylist': True,
     }
 
     try:
-        with YoutubeDL(ydl_opts) as ydl:
-            ydl.extract_info(url, download=False)
+        info = _get_ydl(ydl_opts).extract_info(url, download=False)
     except Exception as e:
         print(f"Error listing formats: {str(e)}")
+        return
 
+    formats = (info or {}).get('formats') or []
+    if not formats:
+        print("No formats found")
+        return
+
+    # Build the whole table first and write it in one go
+    lines = [f"{'ID':<10} {'EXT':<6} {'RESOLUTION':<12} {'FPS':>4} {'SIZE':>10}  {'VCODEC':<14} {'ACODEC':<12} NOTE"]
+    for fmt in formats:
+        size = fmt.get('filesize') or fmt.get('filesize_approx')
+        lines.append(
+            f"{fmt.get('format_id', ''):<10} {fmt.get('ext', ''):<6} {fmt.get('resolution') or '':<12} "
+            f"{fmt.get('fps') or '':>4} {f'{size / 1048576:.1f}MiB' if size else '':>10}  "
+            f"{fmt.get('vcodec') or '':<14} {fmt.get('acodec') or '':<12} {fmt.get('format_note') or ''}")
+    sys.stdout.write('\n'.join(lines) + '\n')
+    sys.stdout.flush()
+
+
+def convert_media(source_path: str, audio_only: bool = False, audio_codec: str = 'mp3') -> dict:
+    """
+    Convert a downloaded file to MP3/M4A (audio only) or MP4 with ffmpeg.
+
+    Args:
+        source_path (str): Path of the file produced by yt-dlp
+        audio_only (bool): If True, extract the audio track only
+        audio_codec (str): 'mp3' re-encodes the audio; 'm4a' remuxes AAC sources without
+            transcoding and encodes anything else (e.g. Opus WebM) to AAC
 
-def download_single_video(url: str, output_path: str, thread_id: int = 0, audio_only: bool = False) -> dict:
+    Returns:
+        dict: Result status with success/failure info and the output file
+    """
+    target_path = os.path.splitext(source_path)[0] + (f'.{audio_codec}' if audio_only else '.mp4')
+    name = os.path.basename(target_path)
+
+    # Merged video downloads are already MP4, nothing to convert
+    if target_path == source_path:
+        return {'file': target_path, 'success': True, 'message': f"✅ Ready: {name}"}
+
+    command = ['ffmpeg', '-y', '-loglevel', 'error', '-i', source_path]
+    if audio_only and audio_codec == 'm4a' and source_path.lower().endswith(AAC_SOURCE_EXTS):
+        command += ['-vn', '-codec:a', 'copy']
+    elif audio_only and audio_codec == 'm4a':
+        command += ['-vn', '-codec:a', 'aac', '-b:a', '192k']
+    elif audio_only:
+        command += ['-vn', '-codec:a', 'libmp3lame', '-q:a', '2']
+    command.append(target_path)
+
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        _, stderr = process.communicate()
+    except OSError as e:
+        return {'file': source_path, 'success': False, 'message': f"❌ FFmpeg error for {name}: {str(e)}"}
+
+    if process.returncode != 0:
+        return {
+            'file': source_path,
+            'success': False,
+            'message': f"❌ FFmpeg failed for {name}: {stderr.decode(errors='replace').strip()}"
+        }
+
+    os.remove(source_path)
+    return {'file': target_path, 'success': True, 'message': f"✅ Converted: {name}"}
+
+
+def download_single_video(url: str, output_path: str, thread_id: int = 0, audio_only: bool = False,
+                          content_type: Optional[str] = None,
+                          on_file: Optional[Callable[[str], None]] = None, audio_codec: str = 'mp3',
+                          concurrent_fragments: int = 4) -> dict:
     """
     Download a single YouTube video, playlist, or channel.
 
@@ -170,20 +449,25 @@ def download_single_video(url: str, output_path: str, thread_id: int = 0, audio_
         output_path (str): Directory to save the download
         thread_id (int): Thread identifier for logging
         audio_only (bool): If True, download audio only in MP3 format
+        content_type (str, optional): Precomputed content type, detected from the URL if omitted
+        on_file (Callable, optional): If given, ffmpeg postprocessing is skipped and the path of
+            every downloaded file is passed to this callback for conversion
+        audio_codec (str): Audio format for audio-only downloads, 'mp3' or 'm4a' (no re-encode)
+        concurrent_fragments (int): Number of DASH/HLS fragments fetched in parallel
 
     Returns:
         dict: Result status with success/failure info
     """
     if audio_only:
-        # Configure for audio-only MP3 downloads
-        format_selector = 'bestaudio/best'
-        file_extension = 'mp3'
+        # Configure for audio-only downloads; M4A prefers AAC sources so ffmpeg only remuxes
+        format_selector = 'bestaudio[ext=m4a]/bestaudio/best' if audio_codec == 'm4a' else 'bestaudio/best'
+        file_extension = audio_codec
         postprocessors = [{
             'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '192',
+            'preferredcodec': audio_codec,
+            'preferredquality': '0' if audio_codec == 'm4a' else '192',
         }]
-        print(f"🎵 [Thread {thread_id}] Audio-only mode: Downloading MP3...")
+        print(f"🎵 [Thread {thread_id}] Audio-only mode: Downloading {audio_codec.upper()}...")
     else:
         # Configure for video downloads
         format_selector = (
@@ -214,6 +498,9 @@ def download_single_video(url: str, output_path: str, thread_id: int = 0, audio_
         'clean_infojson': True,
         'retries': 3,
         'fragment_retries': 3,
+        # Fetch fragmented streams over several connections, in 10 MiB ranges
+        'concurrent_fragment_downloads': concurrent_fragments,
+        'http_chunk_size': 10 * 1024 * 1024,
         # Ensure playlists are fully downloaded
         'noplaylist': False,  # Allow playlist downloads
     }
@@ -222,8 +509,19 @@ def download_single_video(url: str, output_path: str, thread_id: int = 0, audio_
     if not audio_only:
         ydl_opts['merge_output_format'] = 'mp4'
 
+    # Track finished files so playlist/channel runs can tell partial from total failure
+    finished_files = []
+    ydl_opts['post_hooks'] = [finished_files.append]
+
+    # Hand each finished file to the caller instead of converting it in this thread
+    if on_file is not None:
+        ydl_opts['postprocessors'] = []
+        ydl_opts['post_hooks'].append(on_file)
+        file_extension = '%(ext)s'
+
     # Set different output templates for playlists, channels and single videos
-    content_type, cached_info = get_url_info(url)
+    if content_type is None:
+        content_type = get_content_type(url)
 
     # Debug: Print detection result
     if thread_id == 1:  # Only print for first thread to avoid spam
@@ -245,43 +543,47 @@ def download_single_video(url: str, output_path: str, thread_id: int = 0, audio_
         print(
             f"🎥 [Thread {thread_id}] Detected single video URL. Downloading {'audio' if audio_only else 'video'}...")
 
+    # Log from the cached detection info; yt-dlp resolves everything again while downloading
+    _, info = get_url_info(url)
+    title = info.get('title', f'Unknown {content_type.title()}')
+    if content_type in ('playlist', 'channel'):
+        video_count = info.get('playlist_count') or '?'
+        print(
+            f"📋 [Thread {thread_id}] {content_type.title()}: '{title}' ({video_count} videos)")
+
+        # Ensure we have entries to download
+        if info.get('entries_count') == 0:
+            return {
+                'url': url,
+                'success': False,
+                'message': f"❌ [Thread {thread_id}] {content_type.title()} appears to be empty or private"
+            }
+    elif info:
+        print(f"🎥 [Thread {thread_id}] '{title}'")
+
     try:
         with YoutubeDL(ydl_opts) as ydl:
-            # Extract fresh info for download (cached info is only for detection)
-            info = ydl.extract_info(url, download=False)
+            # Download content; a non-zero return code means yt-dlp skipped items after errors
+            return_code = ydl.download([url])
 
-            # Check if info extraction was successful
-            if info is None:
+            if content_type in ('playlist', 'channel') and return_code != 0 and not finished_files:
                 return {
                     'url': url,
                     'success': False,
-                    'message': f"❌ [Thread {thread_id}] Failed to extract video information. Video may be private or unavailable."
+                    'message': f"❌ [Thread {thread_id}] {content_type.title()} '{title}' download failed. No items could be downloaded."
                 }
-
-            if info.get('_type') == 'playlist':
-                title = info.get('title', 'Unknown Playlist')
-                video_count = len(info.get('entries', []))
-                print(
-                    f"📋 [Thread {thread_id}] {content_type.title()}: '{title}' ({video_count} videos)")
-
-                # Ensure we have entries to download
-                if video_count == 0:
-                    return {
-                        'url': url,
-                        'success': False,
-                        'message': f"❌ [Thread {thread_id}] {content_type.title()} appears to be empty or private"
-                    }
-
-            # Download content
-            ydl.download([url])
-
-            if info.get('_type') == 'playlist':
-                title = info.get('title', f'Unknown {content_type.title()}')
-                video_count = len(info.get('entries', []))
+            elif content_type in ('playlist', 'channel'):
+                skipped = ' Some items could not be downloaded.' if return_code != 0 else ''
                 return {
                     'url': url,
                     'success': True,
-                    'message': f"✅ [Thread {thread_id}] {content_type.title()} '{title}' download completed! ({video_count} {'MP3s' if audio_only else 'videos'})"
+                    'message': f"✅ [Thread {thread_id}] {content_type.title()} '{title}' download completed! ({video_count} {f'{audio_codec.upper()}s' if audio_only else 'videos'}){skipped}"
+                }
+            elif return_code != 0:
+                return {
+                    'url': url,
+                    'success': False,
+                    'message': f"❌ [Thread {thread_id}] Download failed. Video may be private or unavailable."
                 }
             else:
                 return {
@@ -299,7 +601,8 @@ def download_single_video(url: str, output_path: str, thread_id: int = 0, audio_
 
 
 def download_youtube_content(urls: List[str], output_path: Optional[str] = None,
-                             list_formats: bool = False, max_workers: int = 3, audio_only: bool = False) -> None:
+                             list_formats: bool = False, max_workers: int = 3, audio_only: bool = False,
+                             audio_codec: str = 'mp3', concurrent_fragments: Optional[int] = None) -> None:
     """
     Download YouTube content (single videos, playlists, or channels) in MP4 format or MP3 audio only.
     Supports multiple URLs for simultaneous downloading.
@@ -310,11 +613,18 @@ def download_youtube_content(urls: List[str], output_path: Optional[str] = None,
         list_formats (bool): If True, only list available formats without downloading
         max_workers (int): Maximum number of concurrent downloads
         audio_only (bool): If True, download audio only in MP3 format
+        audio_codec (str): Audio format for audio-only downloads, 'mp3' or 'm4a' (no re-encode)
+        concurrent_fragments (int, optional): Parallel fragment downloads per URL. Defaults to
+            a value that keeps roughly 8 connections open across all workers
     """
     # Set default output path if none provided
     if output_path is None:
         output_path = os.path.join(os.getcwd(), 'downloads')
 
+    # Split the connection budget between workers: 1 worker -> 8 fragments, 5 workers -> 2
+    if concurrent_fragments is None:
+        concurrent_fragments = max(2, min(8, TOTAL_FRAGMENT_CONNECTIONS // max_workers))
+
     # If user wants to list formats, do that for the first URL and return
     if list_formats:
         print("Available formats for the first provided URL:")
@@ -327,13 +637,16 @@ def download_youtube_content(urls: List[str], output_path: Optional[str] = None,
     print(
         f"\n🚀 Starting download of {len(urls)} URL(s) with {max_workers} concurrent workers...")
     print(f"📁 Output directory: {output_path}")
-    print(f"🎧 Format: {'MP3 Audio Only' if audio_only else 'MP4 Video'}")
+    print(f"🎧 Format: {f'{audio_codec.upper()} Audio Only' if audio_only else 'MP4 Video'}")
+
+    # Detect every URL once and reuse the result for the summary and the downloads.
+    # Detection is network-bound, so probe all URLs concurrently instead of one by one.
+    with ThreadPoolExecutor(max_workers=max(1, min(len(urls), METADATA_WORKERS))) as executor:
+        content_types = list(executor.map(get_content_type, urls))
 
     # Show what types of content we're downloading
-    playlist_count = sum(
-        1 for url in urls if get_content_type(url) == 'playlist')
-    channel_count = sum(
-        1 for url in urls if get_content_type(url) == 'channel')
+    counts = Counter(content_types)
+    playlist_count, channel_count = counts['playlist'], counts['channel']
     video_count = len(urls) - playlist_count - channel_count
 
     content_summary = []
@@ -351,41 +664,68 @@ def download_youtube_content(urls: List[str], output_path: Optional[str] = None,
 
     print("-" * 60)
 
-    # Concurrent downloads
+    # Concurrent downloads feeding a separate ffmpeg process pool, so converting one file
+    # overlaps with downloading the next instead of idling the CPU or the network.
+    # Conversions run in worker processes to keep them off this interpreter's GIL.
     results = []
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    conversions: Dict[str, list] = {url: [] for url in urls}
+    with ThreadPoolExecutor(max_workers=max_workers) as net_pool, \
+            ProcessPoolExecutor(max_workers=os.cpu_count() or 1) as cpu_pool:
+
+        def handoff(url: str) -> Callable[[str], None]:
+            return lambda file_path: conversions[url].append(
+                cpu_pool.submit(convert_media, file_path, audio_only, audio_codec))
+
         future_to_url = {
-            executor.submit(download_single_video, url, output_path, i+1, audio_only): url
-            for i, url in enumerate(urls)
+            net_pool.submit(download_single_video, url, output_path, i+1, audio_only, content_type,
+                            handoff(url), audio_codec, concurrent_fragments): url
+            for i, (url, content_type) in enumerate(zip(urls, content_types))
         }
 
-        # Collect results
+        # Collect results; messages are buffered so concurrent workers don't interleave writes
+        messages = []
         for future in as_completed(future_to_url):
             result = future.result()
             results.append(result)
-            print(result['message'])
+            messages.append(result['message'] + '\n')
 
-    print("\n" + "=" * 60)
-    print("📊 DOWNLOAD SUMMARY")
-    print("=" * 60)
+        # Wait for the remaining conversions and fail URLs whose files could not be converted
+        for result in results:
+            for future in conversions[result['url']]:
+                conversion = future.result()
+                if not conversion['success']:
+                    result['success'] = False
+                    result['message'] = conversion['message']
+                    messages.append(conversion['message'] + '\n')
 
     successful = [r for r in results if r['success']]
     failed = [r for r in results if not r['success']]
 
-    print(f"✅ Successful downloads: {len(successful)}")
-    print(f"❌ Failed downloads: {len(failed)}")
+    messages += [
+        "\n" + "=" * 60 + "\n",
+        "📊 DOWNLOAD SUMMARY\n",
+        "=" * 60 + "\n",
+        f"✅ Successful downloads: {len(successful)}\n",
+        f"❌ Failed downloads: {len(failed)}\n",
+    ]
 
     if failed:
-        print("\n❌ Failed URLs:")
+        messages.append("\n❌ Failed URLs:\n")
         for result in failed:
-            print(f"   • {result['url']}")
-            print(f"     Reason: {result['message']}")
+            messages.append(f"   • {result['url']}\n")
+            messages.append(f"     Reason: {result['message']}\n")
 
     if successful:
-        print(f"\n🎉 All files saved to: {output_path}")
+        messages.append(f"\n🎉 All files saved to: {output_path}\n")
+
+    sys.stdout.write(''.join(messages))
+    sys.stdout.flush()
 
 
 if __name__ == "__main__":
+    # Required for the conversion process pool in the frozen (PyInstaller) build
+    freeze_support()
+
     # Check for command line arguments
     if len(sys.argv) > 1 and sys.argv[1] == '--list-formats':
         url = input("Enter the YouTube URL to list formats: ")
@@ -436,6 +776,10 @@ if __name__ == "__main__":
             print("❌ No valid YouTube URLs found. Please try again.")
             exit(1)
 
+        if '--refresh-metadata' in sys.argv:
+            clear_metadata_cache(urls)
+            print("🔄 Cleared cached metadata for the entered URLs")
+
         print(f"\n✅ Found {len(urls)} valid URL(s)")
         for i, url in enumerate(urls, 1):
             print(f"   {i}. {url}")
@@ -449,12 +793,18 @@ if __name__ == "__main__":
             "\nChoose format:\n"
             "  1. MP4 Video (default)\n"
             "  2. MP3 Audio only\n"
-            "Enter choice (1-2, default=1): ").strip()
+            "  3. M4A Audio only (no re-encoding, faster)\n"
+            "Enter choice (1-3, default=1): ").strip()
 
         audio_only = False
+        audio_codec = 'mp3'
         if format_choice == '2':
             audio_only = True
             print("🎵 Selected: MP3 Audio only")
+        elif format_choice == '3':
+            audio_only = True
+            audio_codec = 'm4a'
+            print("🎵 Selected: M4A Audio only")
         else:
             print("🎥 Selected: MP4 Video")
 
@@ -471,7 +821,7 @@ if __name__ == "__main__":
 
         print(f"\n🎬 Starting downloads...")
         print(f"📊 URLs to download: {len(urls)}")
-        print(f"🎧 Format: {'MP3 Audio' if audio_only else 'MP4 Video'}")
+        print(f"🎧 Format: {f'{audio_codec.upper()} Audio' if audio_only else 'MP4 Video'}")
         if len(urls) > 1:
             print(f"⚡ Concurrent workers: {max_workers}")
         print(
@@ -479,7 +829,9 @@ if __name__ == "__main__":
 
         if output_dir:
             download_youtube_content(
-                urls, output_dir, max_workers=max_workers, audio_only=audio_only)
+                urls, output_dir, max_workers=max_workers, audio_only=audio_only,
+                audio_codec=audio_codec)
         else:
             download_youtube_content(
-                urls, max_workers=max_workers, audio_only=audio_only)
+                urls, max_workers=max_workers, audio_only=audio_only,
+                audio_codec=audio_codec)
@@ -0,0 +1,30 @@
+"""
+Gunicorn configuration for the YouTube Video Downloader API.
+Run with: gunicorn -c gunicorn.conf.py youtube_api:app
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5002)}"
+
+# gthread workers serve each request on an OS thread, so downloads, yt-dlp extraction
+# and other blocking or CPU-bound work in the single worker can't stall other requests.
+# Each open progress stream or video download holds one of the threads for its duration.
+# GUNICORN_WORKER_CLASS=gevent serves requests as greenlets instead, which scales to many
+# more idle connections, but nothing here is patched for it: any blocking call (file
+# I/O, yt-dlp, lock waits) freezes every request in the worker until it returns.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+# Request threads per worker for gthread (gevent ignores this)
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+# Concurrent connections per worker for gevent (gthread ignores this)
+worker_connections = 1000
+
+# A single worker: jobs, progress queues and the download cache live in process
+# memory, so the progress stream must be served by the process that started the job.
+workers = 1
+
+# Downloads are streamed to possibly slow clients; don't kill long requests
+timeout = 0
+graceful_timeout = 30
+
+accesslog = '-'
@@ -389,6 +389,38 @@ function App() {
     input.click();
   };
 
+  // Turn backend extraction errors into a user-facing message
+  const toYouTubeError = (errorMessage) => {
+    // Check if it's a YouTube blocking error
+    if (errorMessage.includes('YouTube blocked') || errorMessage.includes('webpage') || errorMessage.includes('403: Forbidden')) {
+      return new Error('⚠️ YouTube has blocked video downloads. This is common due to their anti-bot measures. Please try:\n\n1. Upload the video file directly using the "Upload Video/Audio" section above\n2. Try again later (YouTube blocking is often temporary)\n3. Use a different video URL\n\nNote: File upload works perfectly and supports the same transcription and summarization features!');
+    }
+    return new Error(errorMessage);
+  };
+
+  // Follow a background extraction job over Server-Sent Events until it finishes
+  const waitForYouTubeJob = (requestId) => new Promise((resolve, reject) => {
+    const source = new EventSource(`${API_BASE_URL}/api/progress/${requestId}`);
+    source.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      if (message.stage === 'done') {
+        source.close();
+        resolve(message.payload);
+      } else if (message.stage === 'error') {
+        source.close();
+        reject(toYouTubeError(message.error || 'Failed to extract video from YouTube video'));
+      } else if (message.stage === 'download') {
+        const rate = message.speed ? ` at ${message.speed}` : '';
+        const detail = message.percent ? ` ${message.percent}${rate}` : '';
+        setCurrentStep(`Downloading YouTube video${message.title ? `: ${message.title}` : ''}...${detail}`);
+      }
+    };
+    source.onerror = () => {
+      source.close();
+      reject(new Error('Lost connection to the YouTube download server'));
+    };
+  });
+
   const handleYouTubeProcess = async () => {
     if (!youtubeUrl.trim()) {
       alert('Please enter a YouTube URL');
@@ -414,17 +446,12 @@ function App() {
 
       if (!response.ok) {
         const errorData = await response.json();
-        const errorMessage = errorData.error || 'Failed to extract video from YouTube video';
-        
-        // Check if it's a YouTube blocking error
-        if (errorMessage.includes('YouTube blocked') || errorMessage.includes('webpage') || errorMessage.includes('403: Forbidden')) {
-          throw new Error('⚠️ YouTube has blocked video downloads. This is common due to their anti-bot measures. Please try:\n\n1. Upload the video file directly using the "Upload Video/Audio" section above\n2. Try again later (YouTube blocking is often temporary)\n3. Use a different video URL\n\nNote: File upload works perfectly and supports the same transcription and summarization features!');
-        }
-        
-        throw new Error(errorMessage);
+        throw toYouTubeError(errorData.error || 'Failed to extract video from YouTube video');
       }
 
-      const data = await response.json();
+      // The download runs in the background; wait for it to finish
+      const job = await response.json();
+      const data = await waitForYouTubeJob(job.request_id);
       setCurrentStep('YouTube video downloaded successfully! Starting transcription...');
 
       // Download the video file
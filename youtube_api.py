@@ -6,126 +6,537 @@ for transcription purposes.
 """
 
 import os
+import re
 import sys
+import logging
+import mimetypes
+import queue
 import tempfile
 import shutil
-from flask import Flask, request, jsonify, send_file
+import threading
+import time
+import random
+import functools
+import atexit
+from logging.handlers import QueueHandler, QueueListener
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from flask_caching import Cache
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
 from yt_dlp import YoutubeDL
+import requests
+import orjson
 import uuid
-from urllib.parse import urlparse, parse_qs
-import traceback
+import unicodedata
+from urllib.parse import quote
+from werkzeug.http import dump_options_header
+from werkzeug.middleware.proxy_fix import ProxyFix
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Serialize JSON responses and progress events with orjson instead of the json module"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)  # Enable CORS for all domains
 
-# Create temporary directory for downloads
-TEMP_DIR = os.path.join(tempfile.gettempdir(), 'youtube_video_extractor')
+# Request bodies are a small JSON object; refuse anything bigger before reading it
+MAX_REQUEST_SIZE = 4096
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_SIZE
+
+# Log through a queue: request and download threads only enqueue records, and a single
+# listener thread formats them and writes to stdout
+log = logging.getLogger('youtube_api')
+log.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+log.propagate = False
+log_queue = queue.Queue(-1)
+log.addHandler(QueueHandler(log_queue))
+_log_output = logging.StreamHandler(sys.stdout)
+_log_output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(threadName)s: %(message)s'))
+log_listener = QueueListener(log_queue, _log_output)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+# Cache finished downloads; Redis when REDIS_URL is set, in-process otherwise
+CACHE_TIMEOUT = 3600
+cache_config = {'CACHE_DEFAULT_TIMEOUT': CACHE_TIMEOUT}
+if os.environ.get('REDIS_URL'):
+    cache_config.update({'CACHE_TYPE': 'RedisCache', 'CACHE_REDIS_URL': os.environ['REDIS_URL']})
+else:
+    cache_config['CACHE_TYPE'] = 'SimpleCache'
+cache = Cache(app, config=cache_config)
+
+# Behind Railway's (or any) reverse proxy, remote_addr is the proxy; set PROXY_HOPS to the
+# number of proxies whose X-Forwarded-For entries are trusted so rate limits apply per client.
+# Off by default: when exposed directly, clients could spoof the header (railway.json sets 1).
+PROXY_HOPS = int(os.environ.get('PROXY_HOPS', 0))
+if PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_HOPS)
+
+# Throttle per client IP so bursts of requests cannot pile up yt-dlp downloads
+limiter = Limiter(
+    get_remote_address,
+    app=app,
+    storage_uri=os.environ.get('REDIS_URL', 'memory://'),
+    default_limits=['60/hour'],
+)
+
+# YouTube video URLs (watch?v=, shorts/, live/, embed/ and youtu.be/); captures the
+# 11-character video id, which must end at a path/query/fragment boundary
+YOUTUBE_VIDEO_RE = re.compile(
+    r'^https?://(?:www\.|m\.)?'
+    r'(?:youtube\.com/(?:watch\?(?:[^&#]+&)*v=|shorts/|live/|embed/)([A-Za-z0-9_-]{11})'
+    r'|youtu\.be/([A-Za-z0-9_-]{11}))(?=[/?&#]|$)',
+    re.IGNORECASE)
+
+# Create temporary directory for downloads; point YT_TEMP_DIR at a tmpfs mount to keep them in RAM.
+# Downloads always get their own subdirectory, since startup cleanup empties it.
+TEMP_DIR = os.path.join(os.environ.get('YT_TEMP_DIR', tempfile.gettempdir()), 'youtube_video_extractor')
 os.makedirs(TEMP_DIR, exist_ok=True)
 
-def is_valid_youtube_url(url):
-    """Check if the URL is a valid YouTube URL"""
-    parsed = urlparse(url)
-    if parsed.netloc in ['youtube.com', 'www.youtube.com', 'youtu.be', 'm.youtube.com']:
-        return True
-    return False
+# Progress queues of extraction jobs, keyed by request_id; kept until the final event is read
+# or, for jobs nobody watches, until the sweeper drops them
+jobs = {}
+jobs_lock = threading.Lock()
+
+# When each job put its final (done/error) event, keyed by request_id; guarded by jobs_lock
+finished_jobs = {}
+
+# Futures of downloads in progress, keyed by video id and format, so identical requests share one download
+inflight = {}
+inflight_lock = threading.Lock()
+
+# Seconds between keep-alive comments on an idle progress stream
+HEARTBEAT_INTERVAL = 15
+
+# Bytes read from disk per chunk when streaming downloads
+STREAM_CHUNK_SIZE = 1 << 20
+
+# Single-file (progressive) downloads at least this large are fetched as parallel byte ranges
+PARALLEL_RANGE_MIN_SIZE = 32 * 1024 * 1024
+PARALLEL_RANGE_WORKERS = 4
+
+# Let ffmpeg fetch and mux the video/audio streams in one pass, so only the final file is
+# written (no separate stream files plus merge). Off by default: single-connection ffmpeg
+# downloads can be throttled by YouTube, so enable it where disk I/O is the bottleneck.
+USE_FFMPEG_DOWNLOADER = os.environ.get('USE_FFMPEG_DOWNLOADER', 'False').lower() == 'true'
+
+# Located once at startup; also handed to yt-dlp so it doesn't search PATH again
+FFMPEG_PATH = shutil.which('ffmpeg')
+if not FFMPEG_PATH:
+    log.warning("🔧 FFmpeg NOT FOUND; merging video and audio streams will fail")
+
+# Request directories older than MAX_FILE_AGE seconds are swept every CLEANUP_INTERVAL seconds
+CLEANUP_INTERVAL = 60
+MAX_FILE_AGE = 1800
+
+# Creation times of request directories still on disk, keyed by request_id; the sweeper
+# checks only these instead of listing TEMP_DIR
+active_dirs = {}
+active_dirs_lock = threading.Lock()
+
+# Paths of finished downloads, keyed by request_id; the download endpoint serves only these,
+# so request URLs are never joined into filesystem paths (also guarded by active_dirs_lock)
+served_files = {}
+
+# Deletes request directories in the background so large rmtrees never block a request
+cleanup_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cleanup')
+
+# Let the front proxy send files: nginx via an internal location mapped to TEMP_DIR
+# (e.g. ACCEL_REDIRECT_PREFIX=/_protected/), or Apache mod_xsendfile via USE_X_SENDFILE=true
+ACCEL_REDIRECT_PREFIX = os.environ.get('ACCEL_REDIRECT_PREFIX')
+USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'False').lower() == 'true'
+
+def parse_youtube_url(url):
+    """Return the video id of a YouTube video URL, or None if the URL is not one"""
+    match = YOUTUBE_VIDEO_RE.match(url)
+    if not match:
+        return None
+    return match.group(1) or match.group(2)
+
+# Leading bytes of the containers yt-dlp produces; MP4/M4A carry "ftyp" at offset 4 instead
+MEDIA_SIGNATURES = (
+    b'\x1aE\xdf\xa3',  # Matroska/WebM (EBML)
+    b'ID3',               # MP3 with ID3 tag
+    b'FLV',
+    b'OggS',
+)
+
+# Extensions of media files yt-dlp writes
+MEDIA_EXTS = frozenset({'.mp4', '.mkv', '.webm', '.avi', '.mov', '.flv', '.m4v', '.m4a', '.mp3', '.ogg', '.opus'})
+
+# Files with a media extension at least this large are accepted without reading their header;
+# error pages are never this big
+SNIFF_MAX_SIZE = 8 * 1024 * 1024
+
+def sniff(path):
+    """
+    Check from its first bytes that a downloaded file is a media container.
+    Raises if it is empty, an HTML/MHTML page (YouTube block or error page) or unrecognised.
+    """
+    if (os.stat(path).st_size >= SNIFF_MAX_SIZE
+            and os.path.splitext(path)[1].lower() in MEDIA_EXTS):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        head = os.pread(fd, 16, 0)
+    finally:
+        os.close(fd)
+
+    if not head:
+        raise Exception("Downloaded file is empty")
+    if head[4:8] == b'ftyp' or head.startswith(MEDIA_SIGNATURES):
+        return
+    if head.lstrip(b'\xef\xbb\xbf \t\r\n').startswith(b'<') or head.lower().startswith(b'mime-version'):
+        raise Exception("YouTube blocked the download: it returned a web page instead of the video")
+    raise Exception(f"Downloaded file is not a recognised media container: {os.path.basename(path)}")
+
+def _trunc(text, limit=500):
+    """Shorten text to limit characters, marking cut text with "..." (None becomes "")"""
+    text = text or ''
+    return text[:limit] + ('...' if len(text) > limit else '')
+
+def content_disposition(filename):
+    """
+    Inline Content-Disposition for a file name. Names that aren't plain ASCII (most video
+    titles) get an ASCII fallback plus an RFC 5987 filename*, as send_file does.
+    """
+    simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+    if simple == filename:
+        options = {'filename': filename}
+    else:
+        options = {'filename': simple, 'filename*': f"UTF-8''{quote(filename, safe='!#$&+^`|')}"}
+    return dump_options_header('inline', options)
+
+def _is_latin1(value):
+    """Whether a string can go into an HTTP header as-is (WSGI headers are Latin-1)"""
+    try:
+        value.encode('latin-1')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+def stream_file(path, start=0, length=None, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield length bytes of a file from offset start (the rest of the file if None)"""
+    # Unbuffered: each read is a single 1 MiB read() straight into the chunk
+    with open(path, 'rb', buffering=0) as f:
+        f.seek(start)
+        remaining = length
+        while remaining is None or remaining > 0:
+            chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+def parse_range_header(range_header, file_size):
+    """
+    Parse a single "bytes=start-end" Range header.
+    Returns (start, end) inclusive, or None if the range cannot be satisfied.
+    """
+    unit, _, spec = range_header.partition('=')
+    if unit.strip() != 'bytes' or ',' in spec:
+        return None
+    start_text, _, end_text = spec.strip().partition('-')
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else file_size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(file_size - int(end_text), 0)
+            end = file_size - 1
+    except ValueError:
+        return None
+    end = min(end, file_size - 1)
+    if start > end:
+        return None
+    return start, end
+
+def _retry_backoff(n):
+    """
+    Seconds yt-dlp waits before retry n (yt-dlp passes n by keyword):
+    1, 2, 4... (capped at 30) plus jitter
+    """
+    return min(2 ** n, 30) + random.random()
+
+class _QuietLogger:
+    """yt-dlp logger that drops its per-fragment chatter and keeps warnings and errors"""
+
+    def debug(self, msg):
+        pass
+
+    def info(self, msg):
+        pass
+
+    def warning(self, msg):
+        log.warning(msg)
+
+    def error(self, msg):
+        log.error(msg)
+
+# Format selectors for the "format" requested in the POST body; audio is enough for transcription
+FORMAT_SELECTORS = {
+    # Use the same successful configuration from download.py
+    'video': (
+        # Try best video+audio combination first
+        'bestvideo[height<=1080]+bestaudio/best[height<=1080]/'
+        # Fallback to best available quality
+        'best'
+    ),
+    'audio': 'bestaudio[ext=m4a]/bestaudio',
+}
+
+# yt-dlp options shared by every download; the output template is set per download
+YDL_OPTS = {
+    'ignoreerrors': True,
+    'no_warnings': False,
+    # Screen output goes to the logger, and no progress lines are formatted; progress hooks still run
+    'logger': _QuietLogger(),
+    'noprogress': True,
+    'extract_flat': False,
+    # Disable additional downloads for clean output
+    'writesubtitles': False,
+    'writethumbnail': False,
+    'writeautomaticsub': False,
+    # Clean up options
+    'retries': 3,
+    'fragment_retries': 3,
+    # yt-dlp only retries transient failures (5xx, throttling, dropped connections); back off
+    # between attempts instead of retrying immediately
+    'retry_sleep_functions': {'http': _retry_backoff, 'fragment': _retry_backoff},
+    # Download in 10 MiB ranged requests, so interrupted transfers resume instead of restarting
+    'http_chunk_size': 10 * 1024 * 1024,
+    # Read and write in blocks of at least 64 KiB instead of starting at 1 KiB
+    'buffersize': 64 * 1024,
+    # Fetch DASH/HLS fragments over 4 connections at once
+    'concurrent_fragment_downloads': 4,
+    # Ensure single video download
+    'noplaylist': True,
+    # Merge format
+    'merge_output_format': 'mp4',
+}
+if FFMPEG_PATH:
+    YDL_OPTS['ffmpeg_location'] = FFMPEG_PATH
+if USE_FFMPEG_DOWNLOADER:
+    YDL_OPTS['external_downloader'] = {'default': 'ffmpeg'}
+    YDL_OPTS['external_downloader_args'] = {'ffmpeg_i': ['-reconnect', '1', '-reconnect_streamed', '1']}
+
+# Worker threads that run download jobs; each keeps its own YoutubeDL between jobs
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+job_pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='download')
+
+# Downloads per YoutubeDL instance before it is replaced, so its caches can't grow without bound
+YDL_MAX_USES = 50
+
+# Per-thread YoutubeDL instances, one per format
+_ydl_local = threading.local()
+
+# The hooks below get the hook state of their YoutubeDL bound in by get_ydl: with concurrent
+# fragment downloads yt-dlp calls them from its own worker threads, so thread-locals won't do
+
+def _record_download(state, d):
+    """Progress hook: report download progress and remember the raw file yt-dlp finished writing"""
+    if d.get('status') == 'downloading':
+        _report_download(state, d)
+    elif d.get('status') == 'finished':
+        state.setdefault('path', d.get('filename'))
+
+def _report_download(state, d):
+    """Pass yt-dlp download progress on, at most once per whole percent of each file"""
+    on_progress = state.get('on_progress')
+    total = d.get('total_bytes') or d.get('total_bytes_estimate')
+    if on_progress is None or not total:
+        return
+    percent = min(int(100 * d.get('downloaded_bytes', 0) / total), 100)
+    if state.get('reported') == (d.get('filename'), percent):
+        return
+    state['reported'] = (d.get('filename'), percent)
+    on_progress({
+        'stage': 'download',
+        # The download stage spans 40-90% of the job
+        'pct': 40 + percent // 2,
+        'title': state.get('title'),
+        'percent': (d.get('_percent_str') or f'{percent}%').strip(),
+        'speed': (d.get('_speed_str') or '').strip(),
+    })
+
+def _record_postprocess(state, d):
+    """Postprocessor hook: remember the final post-processed file"""
+    if d.get('status') == 'finished':
+        state['path'] = d['info_dict'].get('filepath') or state.get('path')
+
+def get_ydl(media_format='video'):
+    """
+    Return this thread's YoutubeDL for a format and the hook state dict its hooks write to,
+    creating it on first use and replacing it after YDL_MAX_USES downloads
+    """
+    if not hasattr(_ydl_local, 'ydls'):
+        _ydl_local.ydls = {}
+    entry = _ydl_local.ydls.get(media_format)
+    if entry is not None and entry[1] >= YDL_MAX_USES:
+        entry[0].__exit__(None, None, None)
+        entry = None
+    if entry is None:
+        hook_state = {}
+        # yt-dlp compiles the format selector once, when the instance is created
+        ydl = YoutubeDL(dict(YDL_OPTS, format=FORMAT_SELECTORS[media_format],
+                             progress_hooks=[functools.partial(_record_download, hook_state)],
+                             postprocessor_hooks=[functools.partial(_record_postprocess, hook_state)]))
+        entry = _ydl_local.ydls[media_format] = [ydl, 0, hook_state]
+    entry[1] += 1
+    return entry[0], entry[2]
 
-def extract_video_from_youtube(url, output_path):
+def download_in_ranges(url, dest, size, headers=None, workers=PARALLEL_RANGE_WORKERS, on_range_done=None):
+    """
+    Download url to dest as parallel HTTP Range requests, one per worker.
+    Each range is written at its own offset of a preallocated file, so no concatenation
+    pass is needed. Raises if the server doesn't honour Range; on_range_done, if given,
+    is called with the bytes downloaded so far as each range finishes.
+    """
+    part_size = -(-size // workers)
+    ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+    part_path = dest + '.part'
+    with open(part_path, 'wb') as f:
+        f.truncate(size)
+
+    def fetch(start, end):
+        range_headers = dict(headers or {}, Range=f'bytes={start}-{end}')
+        with requests.get(url, headers=range_headers, stream=True, timeout=30) as response:
+            if response.status_code != 206:
+                raise Exception(f"Server ignored the Range request (HTTP {response.status_code})")
+            fd = os.open(part_path, os.O_WRONLY)
+            try:
+                offset = start
+                for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                    os.pwrite(fd, chunk, offset)
+                    offset += len(chunk)
+            finally:
+                os.close(fd)
+        if offset != end + 1:
+            raise Exception(f"Range {start}-{end} ended early at byte {offset}")
+        return end + 1 - start
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            done = 0
+            for future in as_completed([pool.submit(fetch, start, end) for start, end in ranges]):
+                done += future.result()
+                if on_range_done:
+                    on_range_done(done)
+        os.replace(part_path, dest)
+    except Exception:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+def _parallel_range_size(info):
+    """Size of a single-file HTTP download worth splitting into ranges, or None"""
+    size = info.get('filesize')
+    if (info.get('requested_formats') or not info.get('url')
+            or info.get('protocol') not in ('http', 'https')):
+        return None
+    return size if size and size >= PARALLEL_RANGE_MIN_SIZE else None
+
+def extract_video_from_youtube(url, output_path, on_progress=None, media_format='video'):
     """
     Download video from YouTube using yt-dlp with the working approach from download.py
-    Returns the path to the downloaded video file and metadata
+    Returns the path to the downloaded video file and metadata.
+    on_progress, if given, is called with a progress message dict between stages and
+    as the download advances.
+    media_format is "video" or "audio" (audio only, for transcription).
     """
     try:
-        # Use the same successful configuration from download.py
-        format_selector = (
-            # Try best video+audio combination first
-            'bestvideo[height<=1080]+bestaudio/best[height<=1080]/'
-            # Fallback to best available quality
-            'best'
-        )
-        
-        # Configure yt-dlp options based on working download.py (simplified)
-        ydl_opts = {
-            'format': format_selector,
-            'ignoreerrors': True,
-            'no_warnings': False,
-            'extract_flat': False,
-            # Disable additional downloads for clean output
-            'writesubtitles': False,
-            'writethumbnail': False,
-            'writeautomaticsub': False,
-            # Clean up options  
-            'retries': 3,
-            'fragment_retries': 3,
-            # Ensure single video download
-            'noplaylist': True,
-            # Output template
-            'outtmpl': os.path.join(output_path, '%(title)s.%(ext)s'),
-            # Merge format
-            'merge_output_format': 'mp4',
-        }
+        ydl, hook_state = get_ydl(media_format)
+        ydl.params['outtmpl'] = {'default': os.path.join(output_path, '%(title)s.%(ext)s')}
+        # Record the path yt-dlp writes: the raw download first, then the final post-processed file
+        hook_state.clear()
+        hook_state['on_progress'] = on_progress
 
-        with YoutubeDL(ydl_opts) as ydl:
-            # Extract info first to get metadata (same as download.py)
-            print(f"📡 Extracting info from: {url}")
-            info = ydl.extract_info(url, download=False)
-            
-            # Check if info extraction was successful
+        log.debug(f"📁 Output directory: {output_path}")
+
+        log.info(f"🎥 Downloading: {url}")
+        info = ydl.extract_info(url, download=False)
+
+        # Check if info extraction was successful
+        if info is None:
+            raise Exception("Failed to extract video information. Video may be private or unavailable.")
+
+        hook_state['title'] = info.get('title')
+        if on_progress:
+            on_progress({'stage': 'download', 'pct': 40, 'title': hook_state['title']})
+
+        # A large single-file format downloads faster over several connections; merged
+        # video+audio formats and everything else are left to yt-dlp
+        video_file = None
+        range_size = _parallel_range_size(info)
+        if range_size:
+            video_file = ydl.prepare_filename(info)
+            report = lambda done: _report_download(
+                hook_state, {'filename': video_file, 'downloaded_bytes': done, 'total_bytes': range_size})
+            try:
+                download_in_ranges(info['url'], video_file, range_size,
+                                   headers=info.get('http_headers'), on_range_done=report)
+            except Exception as e:
+                log.warning(f"Parallel range download failed, falling back to yt-dlp: {e}")
+                video_file = None
+
+        if video_file is None:
+            info = ydl.process_ie_result(info, download=True)
             if info is None:
-                raise Exception("Failed to extract video information. Video may be private or unavailable.")
-            
-            # Download video
-            title = info.get('title', 'Unknown Title')
-            print(f"🎥 Downloading: {title}")
-            print(f"📁 Output directory: {output_path}")
-            
-            # Check FFmpeg availability
-            import shutil as sh
-            ffmpeg_path = sh.which('ffmpeg')
-            print(f"🔧 FFmpeg available: {ffmpeg_path if ffmpeg_path else 'NOT FOUND'}")
-            
-            ydl.download([url])
-            
-            # Find the downloaded file using simple approach
-            all_files = os.listdir(output_path)
-            print(f"Files in directory after download: {all_files}")
-            
-            # Look for video files (common extensions)
-            video_extensions = ['.mp4', '.mkv', '.webm', '.avi', '.mov', '.flv', '.m4v']
-            video_files = [f for f in all_files if any(f.lower().endswith(ext.lower()) for ext in video_extensions)]
-            
-            if video_files:
-                # Get the most recently created file
-                video_files.sort(key=lambda x: os.path.getctime(os.path.join(output_path, x)), reverse=True)
-                video_file = os.path.join(output_path, video_files[0])
-                print(f"✅ Found video file: {video_files[0]}")
-            else:
-                # Check for any non-hidden files
-                other_files = [f for f in all_files if not f.startswith('.') and not f.endswith(('.tmp', '.part'))]
-                if not other_files:
-                    raise Exception(f"No video file found after download. Available files: {all_files}")
-                
-                video_file = os.path.join(output_path, other_files[0])
-                print(f"⚠️ Using file: {other_files[0]}")
-            
-            if not os.path.exists(video_file):
-                raise Exception(f"Video file not found: {video_file}")
-                
-            return {
-                'video_file': video_file,
-                'title': info.get('title', 'Unknown Title'),
-                'duration': info.get('duration', 0),
-                'uploader': info.get('uploader', 'Unknown'),
-                'description': info.get('description', ''),
-                'thumbnail': info.get('thumbnail', ''),
-                'view_count': info.get('view_count', 0),
-                'upload_date': info.get('upload_date', ''),
-            }
-            
+                raise Exception("Failed to download video. Video may be private or unavailable.")
+            # yt-dlp reports the final (post-merge) path of what it wrote
+            requested_downloads = info.get('requested_downloads') or [{}]
+            video_file = (requested_downloads[0].get('filepath') or hook_state.get('path')
+                          or ydl.prepare_filename(info))
+        log.info(f"✅ Downloaded video file: {os.path.basename(video_file)}")
+
+        if not os.path.exists(video_file):
+            raise Exception(f"Video file not found: {video_file}")
+        sniff(video_file)
+
+        return {
+            'video_file': video_file,
+            'title': info.get('title', 'Unknown Title'),
+            'duration': info.get('duration', 0),
+            'uploader': info.get('uploader', 'Unknown'),
+            # Trimmed here so a long description isn't held in full until the response is built
+            'description': _trunc(info.get('description')),
+            'thumbnail': info.get('thumbnail', ''),
+            'view_count': info.get('view_count', 0),
+            'upload_date': info.get('upload_date', ''),
+        }
+
     except Exception as e:
         raise Exception(f"Failed to download video: {str(e)}")
 
+@app.errorhandler(413)
+def request_too_large(e):
+    """Report oversized request bodies in the API's JSON error format"""
+    return jsonify({
+        'success': False,
+        'error': f'Request body too large (limit {MAX_REQUEST_SIZE} bytes)'
+    }), 413
+
+@app.errorhandler(429)
+def rate_limit_exceeded(e):
+    """Report rate limiting in the API's JSON error format"""
+    return jsonify({
+        'success': False,
+        'error': f'Too many requests: {e.description}. Please try again later.'
+    }), 429
+
 @app.route('/api/health', methods=['GET'])
+@limiter.exempt
 def health_check():
     """Health check endpoint"""
     return jsonify({
@@ -134,15 +545,23 @@ def health_check():
     })
 
 @app.route('/api/extract-video', methods=['POST'])
+@limiter.limit('5/minute')
 def extract_video():
     """
-    Download video from YouTube URL
-    Expected JSON payload: {"url": "youtube_url"}
-    Returns: JSON with video file info and download URL
+    Start downloading a video from a YouTube URL
+    Expected JSON payload: {"url": "youtube_url", "format": "video"|"audio"} (format defaults to video)
+    Returns: 202 with the request_id; follow /api/progress/<request_id> for the result
     """
+    request_id = None
+    # The in-flight download this request registered, until a job has been submitted to run it
+    unstarted = None
     try:
-        data = request.get_json()
-        if not data or 'url' not in data:
+        if request.content_length and request.content_length > MAX_REQUEST_SIZE:
+            return request_too_large(None)
+
+        # Malformed JSON parses to None instead of raising
+        data = request.get_json(silent=True, cache=False)
+        if not isinstance(data, dict) or not isinstance(data.get('url'), str):
             return jsonify({
                 'success': False,
                 'error': 'Missing YouTube URL in request body'
@@ -156,56 +575,228 @@ def extract_video():
                 'error': 'Empty YouTube URL provided'
             }), 400
         
-        if not is_valid_youtube_url(url):
+        video_id = parse_youtube_url(url)
+        if not video_id:
             return jsonify({
                 'success': False,
                 'error': 'Invalid YouTube URL. Please provide a valid YouTube video URL.'
             }), 400
+
+        media_format = data.get('format', 'video')
+        if not isinstance(media_format, str) or media_format not in FORMAT_SELECTORS:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid format. Use "video" or "audio".'
+            }), 400
+        # Downloads are shared per video and format
+        download_key = f'{video_id}:{media_format}'
         
-        # Create unique directory for this request
         request_id = str(uuid.uuid4())
+        with jobs_lock:
+            jobs[request_id] = queue.Queue()
+
+        # Reuse a previous download of the same video while its file is still on disk
+        cached = cache.get(f'video:{download_key}')
+        if cached:
+            try:
+                payload = _share_download(cached, request_id)
+            except OSError:
+                payload = None
+            if payload:
+                log.info(f"Reusing download {cached['request_id']} for: {url}")
+                _end_job(request_id, {'stage': 'done', 'pct': 100, 'payload': payload})
+                return jsonify({
+                    'success': True,
+                    'request_id': request_id
+                }), 202
+
+        # Join a download of the same video that is already running instead of starting another;
+        # each joined request gets its own link to the file when it finishes
+        with inflight_lock:
+            download = inflight.get(download_key)
+            is_new = download is None
+            if is_new:
+                download = unstarted = inflight[download_key] = Future()
+        if not is_new:
+            log.info(f"Joining in-flight download for: {url}")
+            download.add_done_callback(lambda future: _forward_result(future, request_id))
+            return jsonify({
+                'success': True,
+                'request_id': request_id
+            }), 202
+
+        # Create unique directory for this request
         request_dir = os.path.join(TEMP_DIR, request_id)
         os.makedirs(request_dir, exist_ok=True)
-        
-        try:
-            print(f"Processing YouTube URL: {url}")
-            result = extract_video_from_youtube(url, request_dir)
-            
-            # Store the file path in a way we can retrieve it later
-            video_filename = os.path.basename(result['video_file'])
-            
-            response_data = {
-                'success': True,
-                'request_id': request_id,
-                'video_filename': video_filename,
-                'metadata': {
-                    'title': result['title'],
-                    'duration': result['duration'],
-                    'uploader': result['uploader'],
-                    'description': result['description'][:500] + '...' if len(result.get('description', '')) > 500 else result.get('description', ''),
-                    'view_count': result.get('view_count', 0),
-                    'upload_date': result.get('upload_date', ''),
-                }
-            }
-            
-            print(f"Successfully downloaded video: {result['title']}")
-            return jsonify(response_data)
-            
-        except Exception as e:
-            # Clean up on failure
-            if os.path.exists(request_dir):
-                shutil.rmtree(request_dir)
-            raise e
-            
+        with active_dirs_lock:
+            active_dirs[request_id] = time.time()
+
+        # Run the download in the background; progress is streamed from /api/progress/<request_id>
+        job_pool.submit(_run_job, request_id, url, request_dir, media_format, download_key, download)
+        unstarted = None
+
+        return jsonify({
+            'success': True,
+            'request_id': request_id
+        }), 202
+
     except Exception as e:
-        print(f"Error extracting audio: {str(e)}")
-        print(traceback.format_exc())
+        log.exception(f"Error extracting video: {str(e)}")
+        # Nobody gets this request_id, so drop its job; fail a download no job will run so
+        # requests that joined it don't wait forever
+        if request_id is not None:
+            with jobs_lock:
+                jobs.pop(request_id, None)
+                finished_jobs.pop(request_id, None)
+        if unstarted is not None:
+            _finish_inflight(download_key, unstarted, error=e)
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+def _end_job(request_id, message):
+    """Put a job's final done/error message on its queue and record when it finished"""
+    with jobs_lock:
+        progress = jobs.get(request_id)
+        if progress is None:
+            return
+        finished_jobs[request_id] = time.time()
+    progress.put(message)
+
+def _share_download(payload, request_id):
+    """
+    Give request_id its own hard link (a copy where links aren't supported) to a finished
+    download, so every client fetches and cleans up its own directory.
+    Returns the payload for request_id; raises OSError if the file is already gone.
+    """
+    with active_dirs_lock:
+        source = served_files.get(payload['request_id'])
+    if source is None:
+        raise FileNotFoundError(f"Download {payload['request_id']} is no longer available")
+
+    request_dir = os.path.join(TEMP_DIR, request_id)
+    os.makedirs(request_dir, exist_ok=True)
+    target = os.path.join(request_dir, os.path.basename(source))
+    try:
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
+    except OSError:
+        shutil.rmtree(request_dir, ignore_errors=True)
+        raise
+
+    with active_dirs_lock:
+        active_dirs[request_id] = time.time()
+        served_files[request_id] = target
+    return dict(payload, request_id=request_id)
+
+def _forward_result(download, request_id):
+    """Report the outcome of a shared in-flight download as another job's result"""
+    error = download.exception()
+    if error is None:
+        try:
+            payload = _share_download(download.result(), request_id)
+        except OSError as e:
+            error = e
+    if error is not None:
+        _end_job(request_id, {'stage': 'error', 'error': str(error)})
+    else:
+        _end_job(request_id, {'stage': 'done', 'pct': 100, 'payload': payload})
+
+def _run_job(request_id, url, request_dir, media_format, download_key, download):
+    """Download a video in a worker thread, pushing progress messages to the job's queue"""
+    with app.app_context():
+        _download_job(request_id, url, request_dir, media_format, download_key, download)
+
+def _download_job(request_id, url, request_dir, media_format, download_key, download):
+    """Body of _run_job, run inside the application context"""
+    progress = jobs[request_id]
+    progress.put({'stage': 'info', 'pct': 10})
+    try:
+        log.info(f"Processing YouTube URL: {url}")
+        result = extract_video_from_youtube(url, request_dir, on_progress=progress.put,
+                                            media_format=media_format)
+
+        # Store the file path in a way we can retrieve it later
+        video_filename = os.path.basename(result['video_file'])
+
+        response_data = {
+            'success': True,
+            'request_id': request_id,
+            'video_filename': video_filename,
+            'metadata': {
+                'title': result['title'],
+                'duration': result['duration'],
+                'uploader': result['uploader'],
+                'description': result['description'],
+                'view_count': result.get('view_count', 0),
+                'upload_date': result.get('upload_date', ''),
+            }
+        }
+
+        with active_dirs_lock:
+            served_files[request_id] = result['video_file']
+            # The file's time to be fetched starts now, not when the download started
+            active_dirs[request_id] = time.time()
+        cache.set(f'video:{download_key}', response_data)
+
+        log.info(f"Successfully downloaded video: {result['title']}")
+        # Joined requests link the file before this job's client can fetch and delete it
+        _finish_inflight(download_key, download, result=response_data)
+        _end_job(request_id, {'stage': 'done', 'pct': 100, 'payload': response_data})
+
+    except Exception as e:
+        log.exception(f"Error extracting video: {str(e)}")
+        # Clean up on failure
+        remove_request_dir(request_dir)
+        _end_job(request_id, {'stage': 'error', 'error': str(e)})
+        _finish_inflight(download_key, download, error=e)
+
+def _finish_inflight(download_key, download, result=None, error=None):
+    """Unregister an in-flight download, then resolve its future for any joined requests"""
+    with inflight_lock:
+        inflight.pop(download_key, None)
+    if error is not None:
+        download.set_exception(error)
+    else:
+        download.set_result(result)
+
+@app.route('/api/progress/<request_id>', methods=['GET'])
+@limiter.exempt
+def job_progress(request_id):
+    """
+    Stream progress of an extraction job as Server-Sent Events.
+    The last event has stage "done" (with the download info as payload) or "error".
+    """
+    with jobs_lock:
+        progress = jobs.get(request_id)
+    if progress is None:
+        return jsonify({'error': 'Unknown or finished request ID'}), 404
+
+    def generate():
+        while True:
+            try:
+                message = progress.get(timeout=HEARTBEAT_INTERVAL)
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+
+            yield f"data: {app.json.dumps(message)}\n\n"
+            if message['stage'] in ('done', 'error'):
+                with jobs_lock:
+                    jobs.pop(request_id, None)
+                    finished_jobs.pop(request_id, None)
+                return
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/api/download-video/<request_id>/<filename>', methods=['GET'])
+@limiter.exempt
 def download_video(request_id, filename):
     """
     Download the video file
@@ -217,40 +808,74 @@ def download_video(request_id, filename):
         except ValueError:
             return jsonify({'error': 'Invalid request ID'}), 400
         
-        file_path = os.path.join(TEMP_DIR, request_id, filename)
-        
-        if not os.path.exists(file_path):
+        # Only files this process downloaded are served, looked up without touching the filesystem
+        file_path = served_files.get(request_id)
+        if file_path is None or os.path.basename(file_path) != filename:
             return jsonify({'error': 'Video file not found or expired'}), 404
+
+        # Audio-only downloads are served as audio
+        mimetype = mimetypes.guess_type(filename)[0] or 'video/mp4'
         
         # Send file and clean up after
         def remove_file():
-            try:
-                request_dir = os.path.join(TEMP_DIR, request_id)
-                if os.path.exists(request_dir):
-                    shutil.rmtree(request_dir)
-            except:
-                pass
+            remove_request_dir(os.path.join(TEMP_DIR, request_id))
         
-        # Send the file
-        response = send_file(
-            file_path,
-            as_attachment=False,  # Don't force download, just serve the file
-            mimetype='video/mp4'
+        # Hand the transfer to the proxy; it serves ranges itself. The proxy is still sending
+        # when this response closes, so the files are left for explicit/scheduled cleanup.
+        # X-Sendfile carries the raw filesystem path, so paths a header can't hold are streamed.
+        if ACCEL_REDIRECT_PREFIX or (USE_X_SENDFILE and _is_latin1(file_path)):
+            response = Response(mimetype=mimetype)
+            if ACCEL_REDIRECT_PREFIX:
+                response.headers['X-Accel-Redirect'] = f"{ACCEL_REDIRECT_PREFIX.rstrip('/')}/{request_id}/{quote(filename)}"
+            else:
+                response.headers['X-Sendfile'] = file_path
+            response.headers['Content-Disposition'] = content_disposition(filename)
+            response.headers['Access-Control-Allow-Origin'] = '*'
+            response.headers['Access-Control-Allow-Methods'] = 'GET'
+            return response
+
+        # Stream the file in fixed-size chunks, honouring Range requests so playback can seek/resume
+        file_size = os.path.getsize(file_path)
+        start, end = 0, file_size - 1
+        range_header = request.headers.get('Range')
+        if range_header:
+            byte_range = parse_range_header(range_header, file_size)
+            if byte_range is None:
+                response = Response(status=416)
+                response.headers['Content-Range'] = f'bytes */{file_size}'
+                return response
+            start, end = byte_range
+
+        # Clean up once the whole file has been handed to the server. Done in the generator
+        # because direct_passthrough responses never run call_on_close callbacks. Partial
+        # ranges (seeks, resumes, tail probes) and interrupted transfers leave the file for
+        # later requests and the sweeper.
+        def stream_and_cleanup():
+            yield from stream_file(file_path, start, end - start + 1)
+            if start == 0 and end == file_size - 1:
+                remove_file()
+
+        response = Response(
+            stream_with_context(stream_and_cleanup()),
+            status=206 if range_header else 200,
+            mimetype=mimetype,
+            direct_passthrough=True
         )
+        response.headers['Content-Length'] = str(end - start + 1)
+        response.headers['Accept-Ranges'] = 'bytes'
+        # Don't force download, just serve the file
+        response.headers['Content-Disposition'] = content_disposition(filename)
+        if range_header:
+            response.headers['Content-Range'] = f'bytes {start}-{end}/{file_size}'
         
         # Set CORS headers
         response.headers['Access-Control-Allow-Origin'] = '*'
         response.headers['Access-Control-Allow-Methods'] = 'GET'
         
-        # Schedule cleanup (note: this runs after the response is sent)
-        @response.call_on_close
-        def cleanup():
-            remove_file()
-        
         return response
         
     except Exception as e:
-        print(f"Error downloading video: {str(e)}")
+        log.exception(f"Error downloading video: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/cleanup/<request_id>', methods=['DELETE'])
@@ -266,7 +891,7 @@ def cleanup_files(request_id):
         
         request_dir = os.path.join(TEMP_DIR, request_id)
         if os.path.exists(request_dir):
-            shutil.rmtree(request_dir)
+            remove_request_dir(request_dir)
             return jsonify({'success': True, 'message': 'Files cleaned up'})
         else:
             return jsonify({'success': True, 'message': 'No files to clean up'})
@@ -274,26 +899,61 @@ def cleanup_files(request_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# Cleanup old files on startup
+# Cleanup old files on startup (nothing is tracked yet, so everything left is stale)
+def _is_request_dir_name(name):
+    """Whether a directory name is a request_id (a UUID), i.e. a directory this API created"""
+    try:
+        uuid.UUID(name)
+    except ValueError:
+        return False
+    return True
+
 def cleanup_old_files():
-    """Clean up old temporary files"""
+    """Clean up old temporary files (request directories only)"""
     try:
-        if os.path.exists(TEMP_DIR):
-            for item in os.listdir(TEMP_DIR):
-                item_path = os.path.join(TEMP_DIR, item)
-                if os.path.isdir(item_path):
-                    try:
-                        shutil.rmtree(item_path)
-                    except:
-                        pass
-        print("Cleaned up old temporary files")
-    except:
+        # scandir's entries know their type, so no extra stat() per item
+        with os.scandir(TEMP_DIR) as entries:
+            for entry in entries:
+                if (entry.is_dir(follow_symlinks=False) and _is_request_dir_name(entry.name)
+                        and entry.name not in active_dirs):
+                    cleanup_pool.submit(shutil.rmtree, entry.path, ignore_errors=True)
+        log.info("Cleaned up old temporary files")
+    except OSError:
         pass
 
+def remove_request_dir(request_dir):
+    """Delete a request directory on the cleanup pool"""
+    with active_dirs_lock:
+        active_dirs.pop(os.path.basename(request_dir), None)
+        served_files.pop(os.path.basename(request_dir), None)
+    cleanup_pool.submit(shutil.rmtree, request_dir, ignore_errors=True)
+
+def _sweeper():
+    """Clear out leftovers from earlier runs, then periodically drop finished jobs nobody
+    watched and delete tracked request directories that were never downloaded or cleaned up"""
+    cleanup_old_files()
+    while True:
+        time.sleep(CLEANUP_INTERVAL)
+        now = time.time()
+        with jobs_lock:
+            for request_id, finished in list(finished_jobs.items()):
+                if now - finished > MAX_FILE_AGE:
+                    jobs.pop(request_id, None)
+                    finished_jobs.pop(request_id, None)
+            running = jobs.keys() - finished_jobs.keys()
+        with active_dirs_lock:
+            tracked = list(active_dirs.items())
+        for request_id, created in tracked:
+            # Jobs that haven't finished may be downloading into their directory right now
+            if request_id not in running and now - created > MAX_FILE_AGE:
+                remove_request_dir(os.path.join(TEMP_DIR, request_id))
+
+# Start the background sweeper (also under WSGI servers, where __main__ doesn't run)
+threading.Thread(target=_sweeper, daemon=True).start()
+
 if __name__ == '__main__':
+    # Development server only; production runs: gunicorn -c gunicorn.conf.py youtube_api:app
     print("Starting YouTube Video Downloader API...")
-    print("Cleaning up old files...")
-    cleanup_old_files()
     
     port = int(os.environ.get('PORT', 5002))
     debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
@@ -301,7 +961,8 @@ if __name__ == '__main__':
     print(f"API will be available at: http://localhost:{port}")
     print("Endpoints:")
     print("  GET  /api/health - Health check")
-    print("  POST /api/extract-video - Download video from YouTube URL")
+    print("  POST /api/extract-video - Start downloading a video from a YouTube URL")
+    print("  GET  /api/progress/<request_id> - Download progress (Server-Sent Events)")
     print("  GET  /api/download-video/<request_id>/<filename> - Download video file")
     
     if debug_mode: